@@ -6,77 +6,154 @@ Run with: python audio_detector.py
 API endpoint: POST http://localhost:8002/analyze-audio
 """
 
+import os
+
+# Feature extractors run in parallel threads - keep BLAS single-threaded
+# per call so they don't oversubscribe the cores
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
 import librosa
 import numpy as np
-import tempfile
 import subprocess
-import os
+import math
 import warnings
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # Suppress librosa warnings
 warnings.filterwarnings('ignore')
 
 app = Flask(__name__)
 CORS(app)
 
+# Audio is extracted as 16 kHz mono and only the first minute is analyzed
+SAMPLE_RATE = 16000
+MAX_AUDIO_SECONDS = 60
+
+# STFT parameters shared by all spectral features
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# Voicing gate for the pitch stats: frames within 20 dB of the loudest frame
+# and with a speech-like (not fricative/noise) zero-crossing rate
+VOICED_RMS_RATIO = 0.1
+VOICED_MAX_ZCR = 0.15
+
+# Shared pool for the independent feature extractors
+FEATURE_POOL = ThreadPoolExecutor(max_workers=6, thread_name_prefix="audio-features")
+
 # ═══════════════════════════════════════════════════════════════
 # AUDIO FEATURE EXTRACTION
 # ═══════════════════════════════════════════════════════════════
 
-def extract_audio_from_video(video_url: str, temp_dir: str) -> str:
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _zcr_rms_kernel(y, frame_length, hop_length):
+        """
+        Framed zero-crossing rate and RMS energy in a single fused pass
+        Frames are centered like librosa (center=True): ZCR edge-pads and RMS
+        zero-pads by frame_length // 2, so padded samples add no crossings and
+        no energy - only the real samples inside each frame are visited
+        """
+        n = len(y)
+        n_frames = 1 + n // hop_length
+        zcr = np.empty(n_frames)
+        rms = np.empty(n_frames)
+        for i in prange(n_frames):
+            start = i * hop_length - frame_length // 2
+            lo = max(start, 0)
+            hi = min(start + frame_length, n)
+            crossings = 0
+            energy = y[lo] * y[lo]
+            for j in range(lo + 1, hi):
+                # librosa treats |y| <= 1e-10 as zero, and zero as positive
+                if (y[j - 1] >= -1e-10) != (y[j] >= -1e-10):
+                    crossings += 1
+                energy += y[j] * y[j]
+            zcr[i] = crossings / frame_length
+            rms[i] = math.sqrt(energy / frame_length)
+        return zcr, rms
+
+
+def _librosa_zcr_rms(y: np.ndarray) -> tuple:
+    zcr = librosa.feature.zero_crossing_rate(y, frame_length=N_FFT, hop_length=HOP_LENGTH)
+    rms = librosa.feature.rms(y=y, frame_length=N_FFT, hop_length=HOP_LENGTH)
+    return zcr[0], rms[0]
+
+
+def _check_kernel_parity() -> bool:
+    """Compile the Numba kernel and compare it with librosa on a fixed signal"""
+    rng = np.random.default_rng(0)
+    t = np.arange(SAMPLE_RATE * 2) / SAMPLE_RATE
+    y = (0.5 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(len(t))).astype(np.float32)
+    expected = _librosa_zcr_rms(y)
+    actual = _zcr_rms_kernel(y, N_FFT, HOP_LENGTH)
+    return all(a.shape == e.shape and np.allclose(a, e, rtol=1e-4, atol=1e-6) for a, e in zip(actual, expected))
+
+
+if NUMBA_AVAILABLE and not _check_kernel_parity():
+    print("[AudioDetector] Numba ZCR/RMS kernel does not match librosa - using librosa")
+    NUMBA_AVAILABLE = False
+
+
+def frame_zcr_rms(y: np.ndarray) -> tuple:
     """
-    Extract audio track from video URL using yt-dlp and FFmpeg
-    Returns path to extracted audio file
+    Per-frame zero-crossing rate and RMS energy (1-D, centered frames)
+    Uses the Numba kernel when available, librosa otherwise
     """
-    audio_path = os.path.join(temp_dir, "audio.wav")
-    
+    if NUMBA_AVAILABLE:
+        return _zcr_rms_kernel(y, N_FFT, HOP_LENGTH)
+    return _librosa_zcr_rms(y)
+
+
+def extract_audio_from_video(video_url: str) -> np.ndarray:
+    """
+    Stream the audio track of a video URL through yt-dlp and FFmpeg
+    Returns 16 kHz mono float32 samples (no temporary files are written)
+    """
+    downloader = None
+    decoder = None
     try:
-        # Use yt-dlp to download and extract audio
-        cmd = [
+        # yt-dlp writes the raw stream to stdout, FFmpeg decodes it to PCM
+        downloader = subprocess.Popen([
             "yt-dlp",
-            "-x",  # Extract audio
-            "--audio-format", "wav",
-            "--audio-quality", "0",
-            "-o", os.path.join(temp_dir, "audio.%(ext)s"),
+            "-f", "bestaudio/best",
+            "-o", "-",
             "--no-playlist",
             "--max-filesize", "50M",
+            "--quiet",
+            "--no-warnings",
             video_url
-        ]
+        ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        
+        decoder = subprocess.Popen([
+            "ffmpeg", "-i", "pipe:0",
+            "-vn", "-t", str(MAX_AUDIO_SECONDS),
+            "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+            "pipe:1"
+        ], stdin=downloader.stdout, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        downloader.stdout.close()  # Let yt-dlp receive SIGPIPE if FFmpeg exits early
         
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
+        raw, _ = decoder.communicate(timeout=120)
+        try:
+            downloader.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            # FFmpeg already has its MAX_AUDIO_SECONDS - keep the decoded audio
+            downloader.kill()
+            downloader.wait()
         
-        if result.returncode != 0:
-            print(f"[AudioDetector] yt-dlp error: {result.stderr}")
+        if not raw:
+            print(f"[AudioDetector] No audio decoded (yt-dlp exit {downloader.returncode}, ffmpeg exit {decoder.returncode})")
             return None
-            
-        # Check if audio file was created
-        if os.path.exists(audio_path):
-            return audio_path
-            
-        # Try alternate extension
-        for ext in ['.wav', '.m4a', '.mp3', '.webm']:
-            alt_path = os.path.join(temp_dir, f"audio{ext}")
-            if os.path.exists(alt_path):
-                # Convert to wav if needed
-                if ext != '.wav':
-                    subprocess.run([
-                        "ffmpeg", "-y", "-i", alt_path,
-                        "-ar", "16000", "-ac", "1",
-                        audio_path
-                    ], capture_output=True, timeout=60)
-                    if os.path.exists(audio_path):
-                        return audio_path
-                else:
-                    return alt_path
-                    
-        return None
+        
+        return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
         
     except subprocess.TimeoutExpired:
         print("[AudioDetector] Audio extraction timeout")
@@ -84,59 +161,88 @@ def extract_audio_from_video(video_url: str, temp_dir: str) -> str:
     except Exception as e:
         print(f"[AudioDetector] Audio extraction error: {e}")
         return None
+    finally:
+        for proc in (decoder, downloader):
+            if proc and proc.poll() is None:
+                proc.kill()
 
 
-def extract_audio_features(audio_path: str) -> dict:
+def _mfcc_from_power(S_power: np.ndarray, sr: int) -> np.ndarray:
+    """MFCCs from a precomputed power spectrogram"""
+    mel = librosa.feature.melspectrogram(S=S_power, sr=sr)
+    return librosa.feature.mfcc(S=librosa.power_to_db(mel), sr=sr, n_mfcc=13)
+
+
+def extract_audio_features(y: np.ndarray, sr: int = SAMPLE_RATE) -> dict:
     """
     Extract audio features using Librosa for deepfake detection
     """
     try:
-        # Load audio at 16kHz mono
-        y, sr = librosa.load(audio_path, sr=16000, mono=True, duration=60)
-        
         if len(y) < sr:  # Less than 1 second of audio
             return None
             
         features = {}
         
+        # Compute the STFT once and share it between all spectral features
+        # (magnitude for centroid/bandwidth/rolloff/flatness, power for mel/chroma)
+        S_mag = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+        S_power = S_mag ** 2
+        
+        # The extractors below are independent and release the GIL inside
+        # NumPy/Numba, so run them concurrently and reduce after the join
+        futures = {
+            'mfcc': FEATURE_POOL.submit(_mfcc_from_power, S_power, sr),
+            'centroid': FEATURE_POOL.submit(librosa.feature.spectral_centroid, S=S_mag, sr=sr),
+            'bandwidth': FEATURE_POOL.submit(librosa.feature.spectral_bandwidth, S=S_mag, sr=sr),
+            'rolloff': FEATURE_POOL.submit(librosa.feature.spectral_rolloff, S=S_mag, sr=sr),
+            'zcr_rms': FEATURE_POOL.submit(frame_zcr_rms, y),
+            'f0': FEATURE_POOL.submit(librosa.yin, y, fmin=50, fmax=500, sr=sr, frame_length=N_FFT, hop_length=HOP_LENGTH),
+            'flatness': FEATURE_POOL.submit(librosa.feature.spectral_flatness, S=S_mag),
+            'chroma': FEATURE_POOL.submit(librosa.feature.chroma_stft, S=S_power, sr=sr),
+        }
+        results = {name: future.result() for name, future in futures.items()}
+        
         # 1. MFCC Analysis (Mel-frequency cepstral coefficients)
         # AI voices often have distinct MFCC patterns
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+        mfccs = results['mfcc']
         features['mfcc_mean'] = float(np.mean(mfccs))
         features['mfcc_std'] = float(np.std(mfccs))
         features['mfcc_variance'] = float(np.var(mfccs))
         
         # 2. Spectral Centroid (brightness of sound)
         # Synthetic voices often have unnatural spectral distribution
-        spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
+        spectral_centroid = results['centroid']
         features['spectral_centroid_mean'] = float(np.mean(spectral_centroid))
         features['spectral_centroid_std'] = float(np.std(spectral_centroid))
         
         # 3. Spectral Bandwidth
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)
+        spectral_bandwidth = results['bandwidth']
         features['spectral_bandwidth_mean'] = float(np.mean(spectral_bandwidth))
         features['spectral_bandwidth_std'] = float(np.std(spectral_bandwidth))
         
         # 4. Spectral Rolloff
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)
+        spectral_rolloff = results['rolloff']
         features['spectral_rolloff_mean'] = float(np.mean(spectral_rolloff))
         
-        # 5. Zero Crossing Rate
+        # 5. Zero Crossing Rate (computed together with RMS in one pass)
         # AI voices tend to have more uniform ZCR
-        zcr = librosa.feature.zero_crossing_rate(y)
+        zcr, rms = results['zcr_rms']
         features['zcr_mean'] = float(np.mean(zcr))
         features['zcr_std'] = float(np.std(zcr))
         features['zcr_variance'] = float(np.var(zcr))
         
         # 6. RMS Energy
-        rms = librosa.feature.rms(y=y)
         features['rms_mean'] = float(np.mean(rms))
         features['rms_std'] = float(np.std(rms))
         
         # 7. Pitch Analysis (Fundamental Frequency)
         # AI voices often have unnaturally consistent pitch
-        pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-        pitch_values = pitches[pitches > 0]
+        # YIN gives a 1-D F0 track instead of piptrack's (freq x frame) matrix,
+        # but estimates every frame - keep only the voiced ones. Its centered
+        # frames line up one-to-one with the ZCR/RMS frames
+        f0 = results['f0']
+        voiced = (rms > VOICED_RMS_RATIO * np.max(rms)) & (zcr <= VOICED_MAX_ZCR)
+        pitch_values = f0[voiced]
         if len(pitch_values) > 0:
             features['pitch_mean'] = float(np.mean(pitch_values))
             features['pitch_std'] = float(np.std(pitch_values))
@@ -147,17 +253,17 @@ def extract_audio_features(audio_path: str) -> dict:
             features['pitch_variance'] = 0
             
         # 8. Spectral Flatness (how noise-like vs tonal)
-        spectral_flatness = librosa.feature.spectral_flatness(y=y)
+        spectral_flatness = results['flatness']
         features['spectral_flatness_mean'] = float(np.mean(spectral_flatness))
         
         # 9. Chroma Features
-        chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+        chroma = results['chroma']
         features['chroma_mean'] = float(np.mean(chroma))
         features['chroma_std'] = float(np.std(chroma))
         
-        # 10. Tempo consistency
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        features['tempo'] = float(tempo) if not np.isnan(tempo) else 0
+        # 10. Rhythm (energy flux of the RMS envelope)
+        # Replaces beat tracking, which was the most expensive call
+        features['energy_flux'] = float(np.mean(np.abs(np.diff(np.ravel(rms)))))
         
         return features
         
@@ -170,6 +276,32 @@ def extract_audio_features(audio_path: str) -> dict:
 # DEEPFAKE DETECTION SCORING
 # ═══════════════════════════════════════════════════════════════
 
+# Threshold lookup table for calculate_deepfake_score
+# (name, feature key, upper bounds, score per bucket, indicator per bucket, weight)
+# A value falls in bucket i when bounds[i-1] <= value < bounds[i]
+SCORE_RULES = [
+    # 1. Pitch Consistency - AI voices have unnaturally consistent pitch (low variance)
+    ('pitch', 'pitch_std', [20, 40, 80], [85, 60, 40, 20],
+     ["Very consistent pitch (AI signature)", "Low pitch variation", None, "Natural pitch variation"], 0.25),
+    # 2. Spectral Smoothness - AI audio often has smoother spectral characteristics
+    ('spectral', 'spectral_bandwidth_std', [200, 400], [80, 55, 25],
+     ["Unnaturally smooth spectrum", None, "Natural spectral variation"], 0.20),
+    # 3. MFCC Variance - Low MFCC variance can indicate synthetic speech
+    ('mfcc', 'mfcc_variance', [50, 150], [75, 50, 25],
+     ["Low vocal tract variation", None, None], 0.20),
+    # 4. Zero-Crossing Rate Uniformity - AI audio tends to have more uniform ZCR
+    ('zcr', 'zcr_std', [0.01, 0.03], [80, 50, 25],
+     ["Uniform zero-crossing (synthetic pattern)", None, None], 0.15),
+    # 5. Energy Consistency - AI voices may have more consistent energy levels
+    ('energy', 'rms_std', [0.01, 0.03], [70, 45, 25],
+     ["Very consistent energy levels", None, None], 0.10),
+    # 6. Spectral Flatness - unusual when < 0.01 or > 0.5 (0.5 itself is normal)
+    ('flatness', 'spectral_flatness_mean', [0.01, np.nextafter(0.5, np.inf)], [65, 30, 65],
+     ["Unusual spectral flatness", None, "Unusual spectral flatness"], 0.10),
+]
+SCORE_WEIGHTS = np.array([rule[5] for rule in SCORE_RULES])
+
+
 def calculate_deepfake_score(features: dict) -> dict:
     """
     Calculate deepfake probability score based on audio features
@@ -179,85 +311,18 @@ def calculate_deepfake_score(features: dict) -> dict:
         return {'score': 50, 'confidence': 0, 'indicators': ['No audio features extracted']}
     
     indicators = []
-    score_components = []
-    
-    # 1. Pitch Consistency Check (Weight: 25%)
-    # AI voices have unnaturally consistent pitch (low variance)
-    pitch_std = features.get('pitch_std', 0)
-    if pitch_std < 20:  # Very consistent pitch
-        pitch_score = 85
-        indicators.append("Very consistent pitch (AI signature)")
-    elif pitch_std < 40:
-        pitch_score = 60
-        indicators.append("Low pitch variation")
-    elif pitch_std < 80:
-        pitch_score = 40
-    else:
-        pitch_score = 20
-        indicators.append("Natural pitch variation")
-    score_components.append(('pitch', pitch_score, 0.25))
-    
-    # 2. Spectral Smoothness (Weight: 20%)
-    # AI audio often has smoother spectral characteristics
-    spectral_bandwidth_std = features.get('spectral_bandwidth_std', 0)
-    if spectral_bandwidth_std < 200:
-        spectral_score = 80
-        indicators.append("Unnaturally smooth spectrum")
-    elif spectral_bandwidth_std < 400:
-        spectral_score = 55
-    else:
-        spectral_score = 25
-        indicators.append("Natural spectral variation")
-    score_components.append(('spectral', spectral_score, 0.20))
-    
-    # 3. MFCC Variance (Weight: 20%)
-    # Low MFCC variance can indicate synthetic speech
-    mfcc_variance = features.get('mfcc_variance', 0)
-    if mfcc_variance < 50:
-        mfcc_score = 75
-        indicators.append("Low vocal tract variation")
-    elif mfcc_variance < 150:
-        mfcc_score = 50
-    else:
-        mfcc_score = 25
-    score_components.append(('mfcc', mfcc_score, 0.20))
-    
-    # 4. Zero-Crossing Rate Uniformity (Weight: 15%)
-    # AI audio tends to have more uniform ZCR
-    zcr_std = features.get('zcr_std', 0)
-    if zcr_std < 0.01:
-        zcr_score = 80
-        indicators.append("Uniform zero-crossing (synthetic pattern)")
-    elif zcr_std < 0.03:
-        zcr_score = 50
-    else:
-        zcr_score = 25
-    score_components.append(('zcr', zcr_score, 0.15))
+    component_scores = {}
+    scores = np.empty(len(SCORE_RULES))
     
-    # 5. Energy Consistency (Weight: 10%)
-    # AI voices may have more consistent energy levels
-    rms_std = features.get('rms_std', 0)
-    if rms_std < 0.01:
-        energy_score = 70
-        indicators.append("Very consistent energy levels")
-    elif rms_std < 0.03:
-        energy_score = 45
-    else:
-        energy_score = 25
-    score_components.append(('energy', energy_score, 0.10))
-    
-    # 6. Spectral Flatness (Weight: 10%)
-    # Synthetic audio may have unusual flatness characteristics
-    spectral_flatness = features.get('spectral_flatness_mean', 0)
-    if spectral_flatness < 0.01 or spectral_flatness > 0.5:
-        flatness_score = 65
-        indicators.append("Unusual spectral flatness")
-    else:
-        flatness_score = 30
-    score_components.append(('flatness', flatness_score, 0.10))
+    # Bucketize each feature with a threshold lookup instead of if/elif chains
+    for i, (name, key, bounds, bucket_scores, bucket_indicators, _) in enumerate(SCORE_RULES):
+        bucket = int(np.searchsorted(bounds, features.get(key, 0), side='right'))
+        scores[i] = component_scores[name] = bucket_scores[bucket]
+        if bucket_indicators[bucket]:
+            indicators.append(bucket_indicators[bucket])
     
     # Calculate weighted final score
-    final_score = sum(score * weight for _, score, weight in score_components)
+    final_score = float(np.dot(scores, SCORE_WEIGHTS))
     
     # Calculate confidence based on feature availability and clarity
     confidence = min(95, 60 + len([i for i in indicators if 'signature' in i.lower() or 'synthetic' in i.lower()]) * 15)
@@ -266,7 +331,7 @@ def calculate_deepfake_score(features: dict) -> dict:
         'score': int(round(final_score)),
         'confidence': confidence,
         'indicators': indicators,
-        'component_scores': {name: score for name, score, _ in score_components}
+        'component_scores': component_scores
     }
 
 
@@ -314,49 +379,47 @@ def analyze_audio():
         video_url = data['url']
         print(f"[AudioDetector] Analyzing: {video_url[:80]}...")
         
-        # Create temp directory for audio extraction
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Extract audio from video
-            audio_path = extract_audio_from_video(video_url, temp_dir)
-            
-            if not audio_path:
-                print("[AudioDetector] No audio track found")
-                return jsonify({
-                    'success': True,
-                    'score': 50,  # Neutral score when no audio
-                    'confidence': 0,
-                    'indicators': ['No audio track found'],
-                    'has_audio': False
-                })
-            
-            print(f"[AudioDetector] Audio extracted: {audio_path}")
-            
-            # Extract features
-            features = extract_audio_features(audio_path)
-            
-            if not features:
-                return jsonify({
-                    'success': True,
-                    'score': 50,
-                    'confidence': 0,
-                    'indicators': ['Audio too short or corrupted'],
-                    'has_audio': False
-                })
-            
-            # Calculate deepfake score
-            result = calculate_deepfake_score(features)
-            
-            print(f"[AudioDetector] Score: {result['score']}%, Confidence: {result['confidence']}%")
-            
+        # Extract audio from video
+        samples = extract_audio_from_video(video_url)
+        
+        if samples is None:
+            print("[AudioDetector] No audio track found")
             return jsonify({
                 'success': True,
-                'score': result['score'],
-                'confidence': result['confidence'],
-                'indicators': result['indicators'],
-                'component_scores': result.get('component_scores', {}),
-                'has_audio': True
+                'score': 50,  # Neutral score when no audio
+                'confidence': 0,
+                'indicators': ['No audio track found'],
+                'has_audio': False
             })
-            
+        
+        print(f"[AudioDetector] Audio extracted: {len(samples) / SAMPLE_RATE:.1f}s")
+        
+        # Extract features
+        features = extract_audio_features(samples)
+        
+        if not features:
+            return jsonify({
+                'success': True,
+                'score': 50,
+                'confidence': 0,
+                'indicators': ['Audio too short or corrupted'],
+                'has_audio': False
+            })
+        
+        # Calculate deepfake score
+        result = calculate_deepfake_score(features)
+        
+        print(f"[AudioDetector] Score: {result['score']}%, Confidence: {result['confidence']}%")
+        
+        return jsonify({
+            'success': True,
+            'score': result['score'],
+            'confidence': result['confidence'],
+            'indicators': result['indicators'],
+            'component_scores': result.get('component_scores', {}),
+            'has_audio': True
+        })
+        
     except Exception as e:
         print(f"[AudioDetector] Error: {e}")
         return jsonify({
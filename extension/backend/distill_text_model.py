@@ -0,0 +1,184 @@
+"""
+Knowledge Distillation Script for the Text Detection Model
+Distills roberta-base-openai-detector (12 layers) into a 6-layer DistilRoBERTa student
+
+The student is trained on a mix of human-written and GPT-generated text with
+KL(teacher || student) on temperature-softened logits plus cross-entropy
+on the hard labels. Only the student is needed at serving time.
+
+Prerequisites:
+  pip install torch transformers datasets accelerate
+
+Run: python distill_text_model.py
+Then serve it with:
+  UNREAL_TEXT_MODEL_PATH=./text_model_distilled python text_detector.py
+"""
+
+import torch
+import torch.nn.functional as F
+from datasets import load_dataset, concatenate_datasets
+from transformers import (
+    AutoTokenizer,
+    AutoModelForSequenceClassification,
+    TrainingArguments,
+    Trainer
+)
+import numpy as np
+import os
+
+# ==========================================
+# Configuration
+# ==========================================
+TEACHER_ID = "openai-community/roberta-base-openai-detector"
+STUDENT_ID = "distilroberta-base"          # 6-layer student, same tokenizer as teacher
+OUTPUT_DIR = "./text_model_distilled"
+DATASET_ID = "aadityaubhat/GPT-wiki-intro"  # Paired human / GPT-3 Wikipedia intros
+MAX_SAMPLES = 20000                         # Per class
+MAX_LENGTH = 512
+
+# Training hyperparameters
+EPOCHS = 2
+BATCH_SIZE = 16
+LEARNING_RATE = 5e-5
+TEMPERATURE = 2.0
+ALPHA = 0.5  # Weight of the distillation loss vs. hard-label cross-entropy
+
+# Teacher labels: 0 -> Fake (AI), 1 -> Real (Human). The student keeps the same mapping.
+LABEL_AI = 0
+LABEL_HUMAN = 1
+
+device = "cuda" if torch.cuda.is_available() else "cpu"
+print(f"Using device: {device}")
+
+# ==========================================
+# Load Teacher & Student
+# ==========================================
+print(f"\n[1] Loading teacher: {TEACHER_ID}")
+tokenizer = AutoTokenizer.from_pretrained(TEACHER_ID)
+teacher = AutoModelForSequenceClassification.from_pretrained(TEACHER_ID).to(device)
+teacher.eval()
+
+print(f"    Loading student: {STUDENT_ID}")
+student = AutoModelForSequenceClassification.from_pretrained(
+    STUDENT_ID,
+    num_labels=2,
+    id2label=teacher.config.id2label,
+    label2id=teacher.config.label2id,
+)
+
+teacher_params = sum(p.numel() for p in teacher.parameters()) / 1e6
+student_params = sum(p.numel() for p in student.parameters()) / 1e6
+print(f"   Teacher: {teacher_params:.0f}M params, Student: {student_params:.0f}M params")
+
+# ==========================================
+# Load Dataset (human + generated text)
+# ==========================================
+print(f"\n[2] Loading dataset: {DATASET_ID}")
+raw = load_dataset(DATASET_ID, split="train").shuffle(seed=42)
+raw = raw.select(range(min(MAX_SAMPLES, len(raw))))
+
+human = raw.map(lambda b: {"text": b["wiki_intro"], "label": [LABEL_HUMAN] * len(b["wiki_intro"])},
+                batched=True, remove_columns=raw.column_names)
+generated = raw.map(lambda b: {"text": b["generated_intro"], "label": [LABEL_AI] * len(b["generated_intro"])},
+                    batched=True, remove_columns=raw.column_names)
+dataset = concatenate_datasets([human, generated]).shuffle(seed=42)
+
+def tokenize(batch):
+    return tokenizer(batch["text"], truncation=True, max_length=MAX_LENGTH)
+
+dataset = dataset.map(tokenize, batched=True, remove_columns=["text"])
+dataset = dataset.rename_column("label", "labels")
+splits = dataset.train_test_split(test_size=0.1, seed=42)
+
+print(f"   Train: {len(splits['train'])} texts")
+print(f"   Test: {len(splits['test'])} texts")
+
+# ==========================================
+# Distillation Trainer
+# ==========================================
+class DistillationTrainer(Trainer):
+    """Trainer that mixes teacher soft targets into the loss"""
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        labels = inputs["labels"]
+        outputs = model(**inputs)
+        student_logits = outputs.logits
+
+        with torch.no_grad():
+            teacher_logits = teacher(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"]
+            ).logits
+
+        # KL on softened distributions, scaled by T^2 to keep gradient magnitudes comparable
+        distill_loss = F.kl_div(
+            F.log_softmax(student_logits / TEMPERATURE, dim=-1),
+            F.softmax(teacher_logits / TEMPERATURE, dim=-1),
+            reduction="batchmean"
+        ) * (TEMPERATURE ** 2)
+        hard_loss = F.cross_entropy(student_logits, labels)
+
+        loss = ALPHA * distill_loss + (1 - ALPHA) * hard_loss
+        return (loss, outputs) if return_outputs else loss
+
+def compute_metrics(eval_pred):
+    """Compute accuracy for evaluation"""
+    predictions = np.argmax(eval_pred.predictions, axis=1)
+    labels = eval_pred.label_ids
+    accuracy = (predictions == labels).mean()
+    return {"accuracy": accuracy}
+
+training_args = TrainingArguments(
+    output_dir=OUTPUT_DIR,
+    eval_strategy="epoch",
+    save_strategy="epoch",
+    learning_rate=LEARNING_RATE,
+    per_device_train_batch_size=BATCH_SIZE,
+    per_device_eval_batch_size=BATCH_SIZE,
+    num_train_epochs=EPOCHS,
+    warmup_ratio=0.1,
+    logging_steps=50,
+    save_total_limit=1,
+    load_best_model_at_end=True,
+    metric_for_best_model="accuracy",
+    fp16=(device == "cuda"),
+)
+
+trainer = DistillationTrainer(
+    model=student,
+    args=training_args,
+    train_dataset=splits["train"],
+    eval_dataset=splits["test"],
+    tokenizer=tokenizer,  # Enables dynamic padding
+    compute_metrics=compute_metrics,
+)
+
+# ==========================================
+# Distill!
+# ==========================================
+print("\n" + "=" * 60)
+print(">>> Starting Distillation...")
+print("=" * 60)
+print(f"   Epochs: {EPOCHS}")
+print(f"   Temperature: {TEMPERATURE}, Alpha: {ALPHA}")
+print("=" * 60 + "\n")
+
+trainer.train()
+
+print("\n[3] Evaluating student...")
+results = trainer.evaluate()
+print(f"   Student Accuracy: {results['eval_accuracy'] * 100:.2f}%")
+
+# ==========================================
+# Save
+# ==========================================
+print(f"\n[4] Saving distilled model to: {OUTPUT_DIR}")
+trainer.save_model(OUTPUT_DIR)
+tokenizer.save_pretrained(OUTPUT_DIR)
+
+print("\n" + "=" * 60)
+print("[SUCCESS] Distillation complete!")
+print("=" * 60)
+print("\nTo serve the student model:")
+print(f"   UNREAL_TEXT_MODEL_PATH={OUTPUT_DIR} python text_detector.py")
+print("\nDone!")
@@ -3,25 +3,26 @@ Fine-tuning Script for Social Media AI Detection Model
 Fine-tunes dima806/ai_vs_real_image_detection on social media dataset
 
 Prerequisites:
-  pip install torch torchvision transformers datasets scikit-learn accelerate
+  pip install torch torchvision transformers datasets scikit-learn accelerate peft
 
 Run: python fine_tune.py
 """
 
 import torch
-from datasets import load_dataset
+from datasets import load_dataset, Image as DatasetImage
 from transformers import (
     AutoImageProcessor, 
     AutoModelForImageClassification, 
     TrainingArguments, 
     Trainer
 )
-from torchvision.transforms import (
-    Compose, Normalize, RandomResizedCrop, RandomHorizontalFlip, 
-    ToTensor, Resize, CenterCrop, ColorJitter
-)
+from torchvision.io import decode_image, read_file, ImageReadMode
+from torchvision.transforms import v2
+from peft import LoraConfig, get_peft_model
 import numpy as np
+from functools import partial
 import os
+import sys
 
 # ==========================================
 # Configuration
@@ -35,113 +36,69 @@ EPOCHS = 3
 BATCH_SIZE = 16
 LEARNING_RATE = 2e-5  # Very low to preserve existing knowledge
 
-# ==========================================
-# Check CUDA availability
-# ==========================================
-# Note: RTX 5050 (sm_120) kernels not yet supported in PyTorch
-# Forcing CPU mode to avoid CUDA errors
-device = "cpu"  # Forced CPU - GPU sm_120 not supported
-print(f"Using device: {device}")
-print("Note: GPU training unavailable (RTX 5050 sm_120 not yet supported in PyTorch)")
-print("Training will take ~2-4 hours on CPU")
-
-# ==========================================
-# Load Model & Processor
-# ==========================================
-print(f"\n[1] Loading base model: {MODEL_ID}")
-processor = AutoImageProcessor.from_pretrained(MODEL_ID)
-model = AutoModelForImageClassification.from_pretrained(
-    MODEL_ID, 
-    num_labels=2,
-    ignore_mismatched_sizes=True
-)
-model = model.to(device)
+# LoRA: train low-rank adapters on the attention Q/V projections instead of
+# the full backbone (far fewer gradients and optimizer state)
+USE_LORA = True
+LORA_RANK = 8
+LORA_ALPHA = 16
+LORA_LEARNING_RATE = 5e-4  # Adapters start at zero, so they need a higher LR
 
-# Get image normalization values
-normalize = Normalize(mean=processor.image_mean, std=processor.image_std)
-size = (processor.size["height"], processor.size["width"])
+# Post-training static INT8 quantization (x86 backend) for CPU serving
+QUANTIZE_INT8 = True
+CALIBRATION_SAMPLES = 200
+INT8_MODEL_FILE = "model_int8.pt"  # TorchScript, saved inside OUTPUT_DIR
 
-print(f"   Model loaded! Target size: {size}")
+# BF16 autocast on CPU only pays off with AVX-512 BF16 / AMX - opt in
+CPU_BF16 = os.environ.get("UNREAL_CPU_BF16", "0") == "1"
 
 # ==========================================
 # Data Augmentation (Simulate Social Media Noise)
 # ==========================================
-train_transforms = Compose([
-    RandomResizedCrop(size),
-    RandomHorizontalFlip(),
-    ColorJitter(brightness=0.2, contrast=0.2, saturation=0.1),  # Simulate bad conditions
-    ToTensor(),
-    normalize,
-])
-
-val_transforms = Compose([
-    Resize(size),
-    CenterCrop(size),
-    ToTensor(),
-    normalize,
-])
-
-def preprocess_train(batch):
-    """Apply training augmentations"""
-    batch["pixel_values"] = [
-        train_transforms(img.convert("RGB")) for img in batch["image"]
-    ]
-    return batch
+# Images are decoded straight to uint8 tensors and augmented with the
+# tensor-based v2 transforms (no PIL round trip). Random ops stay per-image
+# so every sample gets its own crop/jitter; the float conversion and
+# normalization run once on the whole stacked batch in collate_fn.
+# The transforms are built in main() and bound with functools.partial, so
+# DataLoader workers (spawned on Windows/macOS) get them by pickling instead
+# of re-running the module.
+def build_transforms(size, processor):
+    """Return (train, val, batch normalization) transforms for the target size"""
+    train_transforms = v2.Compose([
+        v2.RandomResizedCrop(size, antialias=True),
+        v2.RandomHorizontalFlip(),
+        v2.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.1),  # Simulate bad conditions
+    ])
+    val_transforms = v2.Compose([
+        v2.Resize(size, antialias=True),
+        v2.CenterCrop(size),
+    ])
+    batch_normalize = v2.Compose([
+        v2.ToDtype(torch.float32, scale=True),
+        v2.Normalize(mean=processor.image_mean, std=processor.image_std),
+    ])
+    return train_transforms, val_transforms, batch_normalize
+
+def decode_rgb(image):
+    """Decode an undecoded dataset image ({'bytes', 'path'}) to a uint8 CHW tensor"""
+    if image["bytes"] is not None:
+        data = torch.frombuffer(bytearray(image["bytes"]), dtype=torch.uint8)
+    else:
+        data = read_file(image["path"])
+    return decode_image(data, mode=ImageReadMode.RGB)
 
-def preprocess_val(batch):
-    """Apply validation transforms (no augmentation)"""
+def preprocess(batch, transforms):
+    """Decode a batch and apply per-image transforms (augmentation for train)"""
     batch["pixel_values"] = [
-        val_transforms(img.convert("RGB")) for img in batch["image"]
+        transforms(decode_rgb(img)) for img in batch["image"]
     ]
     return batch
 
-def collate_fn(examples):
-    """Custom collate function to properly stack tensors"""
-    pixel_values = torch.stack([example["pixel_values"] for example in examples])
+def collate_fn(examples, normalize):
+    """Stack uint8 tensors, then convert + normalize the whole batch at once"""
+    pixel_values = normalize(torch.stack([example["pixel_values"] for example in examples]))
     labels = torch.tensor([example["label"] for example in examples])
     return {"pixel_values": pixel_values, "labels": labels}
 
-# ==========================================
-# Load Dataset
-# ==========================================
-print(f"\n[2] Loading dataset from: {DATASET_DIR}")
-
-if not os.path.exists(DATASET_DIR):
-    print("[ERROR] Dataset not found! Run prepare_dataset.py first:")
-    print("   python prepare_dataset.py")
-    exit(1)
-
-# Load using imagefolder format (auto-detects class folders)
-dataset = load_dataset("imagefolder", data_dir=DATASET_DIR)
-
-print(f"   Train: {len(dataset['train'])} images")
-print(f"   Test: {len(dataset['test'])} images")
-print(f"   Labels: {dataset['train'].features['label'].names}")
-
-# Apply transforms
-train_ds = dataset["train"].with_transform(preprocess_train)
-test_ds = dataset["test"].with_transform(preprocess_val)
-
-# ==========================================
-# Training Arguments
-# ==========================================
-training_args = TrainingArguments(
-    output_dir=OUTPUT_DIR,
-    remove_unused_columns=False,
-    eval_strategy="epoch",
-    save_strategy="epoch",
-    learning_rate=LEARNING_RATE,
-    per_device_train_batch_size=BATCH_SIZE,
-    per_device_eval_batch_size=BATCH_SIZE,
-    num_train_epochs=EPOCHS,
-    warmup_ratio=0.1,
-    logging_steps=10,
-    save_total_limit=2,
-    load_best_model_at_end=True,
-    metric_for_best_model="accuracy",
-    fp16=False,  # Disabled for CPU training
-)
-
 # ==========================================
 # Metrics
 # ==========================================
@@ -153,51 +110,203 @@ def compute_metrics(eval_pred):
     return {"accuracy": accuracy}
 
 # ==========================================
-# Trainer
+# Quantize (INT8, per-channel static)
 # ==========================================
-print("\n[3] Setting up Trainer...")
-
-trainer = Trainer(
-    model=model,
-    args=training_args,
-    train_dataset=train_ds,
-    eval_dataset=test_ds,
-    data_collator=collate_fn,
-    compute_metrics=compute_metrics,
-)
+def quantize_static_int8(fp32_model, calibration_ds, collate):
+    """
+    Post-training static quantization with FX graph mode.
+    Calibrates activation ranges on calibration_ds and returns a TorchScript module.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+    from transformers.utils.fx import symbolic_trace
 
-# ==========================================
-# Train!
-# ==========================================
-print("\n" + "=" * 60)
-print(">>> Starting Fine-Tuning...")
-print("=" * 60)
-print(f"   Epochs: {EPOCHS}")
-print(f"   Batch Size: {BATCH_SIZE}")
-print(f"   Learning Rate: {LEARNING_RATE}")
-print(f"   Device: {device}")
-print("=" * 60 + "\n")
+    torch.backends.quantized.engine = "x86"
+    fp32_model = fp32_model.to("cpu").float().eval()
+    graph_model = symbolic_trace(fp32_model, input_names=["pixel_values"])
 
-trainer.train()
+    n = min(CALIBRATION_SAMPLES, len(calibration_ds))
+    batches = [
+        collate([calibration_ds[j] for j in range(i, min(i + BATCH_SIZE, n))])["pixel_values"]
+        for i in range(0, n, BATCH_SIZE)
+    ]
 
-# ==========================================
-# Evaluate
-# ==========================================
-print("\n[4] Evaluating model...")
-results = trainer.evaluate()
-print(f"   Final Accuracy: {results['eval_accuracy'] * 100:.2f}%")
+    prepared = prepare_fx(graph_model, get_default_qconfig_mapping("x86"), example_inputs=(batches[0],))
+    with torch.no_grad():
+        for pixel_values in batches:
+            prepared(pixel_values)
+        quantized = convert_fx(prepared)
+        return torch.jit.trace(quantized, (batches[0][:1],), strict=False)
 
-# ==========================================
-# Save
-# ==========================================
-print(f"\n[5] Saving fine-tuned model to: {OUTPUT_DIR}")
-trainer.save_model(OUTPUT_DIR)
-processor.save_pretrained(OUTPUT_DIR)
-
-print("\n" + "=" * 60)
-print("[SUCCESS] Fine-tuning complete!")
-print("=" * 60)
-print(f"\nModel saved to: {OUTPUT_DIR}/")
-print("\nTo use this model, update backend/server.py:")
-print('   MODEL_PATH = "./social_media_tuned_model"')
-print("\nDone!")
+def main():
+    # ==========================================
+    # Check CUDA availability
+    # ==========================================
+    # Recent PyTorch builds (CUDA 12.8+) support Blackwell / sm_120 GPUs
+    if torch.cuda.is_available():
+        device = "cuda"
+        use_bf16 = torch.cuda.is_bf16_supported()  # Ampere+ -> BF16, older -> FP16
+        use_fp16 = not use_bf16
+    else:
+        device = "cpu"
+        use_bf16 = CPU_BF16
+        use_fp16 = False
+
+    precision = "bf16" if use_bf16 else "fp16" if use_fp16 else "fp32"
+    print(f"Using device: {device} ({precision})")
+    if device == "cpu":
+        print("Training will take ~2-4 hours on CPU")
+
+    # ==========================================
+    # Load Model & Processor
+    # ==========================================
+    print(f"\n[1] Loading base model: {MODEL_ID}")
+    processor = AutoImageProcessor.from_pretrained(MODEL_ID)
+    model = AutoModelForImageClassification.from_pretrained(
+        MODEL_ID, 
+        num_labels=2,
+        ignore_mismatched_sizes=True
+    )
+
+    if USE_LORA:
+        lora_config = LoraConfig(
+            r=LORA_RANK,
+            lora_alpha=LORA_ALPHA,
+            target_modules=["query", "value"],
+            bias="none",
+            modules_to_save=["classifier"],  # New 2-class head is trained in full
+        )
+        model = get_peft_model(model, lora_config)
+        model.print_trainable_parameters()
+
+    model = model.to(device)
+
+    # Get target size
+    size = (processor.size["height"], processor.size["width"])
+
+    print(f"   Model loaded! Target size: {size}")
+
+    train_transforms, val_transforms, batch_normalize = build_transforms(size, processor)
+    collate = partial(collate_fn, normalize=batch_normalize)
+
+    # ==========================================
+    # Load Dataset
+    # ==========================================
+    print(f"\n[2] Loading dataset from: {DATASET_DIR}")
+
+    if not os.path.exists(DATASET_DIR):
+        print("[ERROR] Dataset not found! Run prepare_dataset.py first:")
+        print("   python prepare_dataset.py")
+        sys.exit(1)
+
+    # Load using imagefolder format (auto-detects class folders)
+    dataset = load_dataset("imagefolder", data_dir=DATASET_DIR)
+    # Keep raw bytes/paths - decoding happens in decode_rgb() with torchvision
+    dataset = dataset.cast_column("image", DatasetImage(decode=False))
+
+    print(f"   Train: {len(dataset['train'])} images")
+    print(f"   Test: {len(dataset['test'])} images")
+    print(f"   Labels: {dataset['train'].features['label'].names}")
+
+    # Apply transforms
+    train_ds = dataset["train"].with_transform(partial(preprocess, transforms=train_transforms))
+    test_ds = dataset["test"].with_transform(partial(preprocess, transforms=val_transforms))
+
+    # ==========================================
+    # Training Arguments
+    # ==========================================
+    training_args = TrainingArguments(
+        output_dir=OUTPUT_DIR,
+        remove_unused_columns=False,
+        eval_strategy="epoch",
+        save_strategy="epoch",
+        learning_rate=LORA_LEARNING_RATE if USE_LORA else LEARNING_RATE,
+        per_device_train_batch_size=BATCH_SIZE,
+        per_device_eval_batch_size=BATCH_SIZE,
+        num_train_epochs=EPOCHS,
+        warmup_ratio=0.1,
+        logging_steps=10,
+        save_total_limit=2,
+        load_best_model_at_end=True,
+        metric_for_best_model="accuracy",
+        bf16=use_bf16,
+        fp16=use_fp16,
+        dataloader_num_workers=max(1, (os.cpu_count() or 2) // 2),
+        dataloader_pin_memory=(device == "cuda"),
+    )
+
+    # ==========================================
+    # Trainer
+    # ==========================================
+    print("\n[3] Setting up Trainer...")
+
+    trainer = Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=train_ds,
+        eval_dataset=test_ds,
+        data_collator=collate,
+        compute_metrics=compute_metrics,
+    )
+
+    # ==========================================
+    # Train!
+    # ==========================================
+    print("\n" + "=" * 60)
+    print(">>> Starting Fine-Tuning...")
+    print("=" * 60)
+    print(f"   Epochs: {EPOCHS}")
+    print(f"   Batch Size: {BATCH_SIZE}")
+    print(f"   Learning Rate: {training_args.learning_rate}")
+    print(f"   LoRA: {'r=' + str(LORA_RANK) if USE_LORA else 'disabled (full fine-tune)'}")
+    print(f"   Device: {device} ({precision})")
+    print("=" * 60 + "\n")
+
+    trainer.train()
+
+    # ==========================================
+    # Evaluate
+    # ==========================================
+    print("\n[4] Evaluating model...")
+    results = trainer.evaluate()
+    print(f"   Final Accuracy: {results['eval_accuracy'] * 100:.2f}%")
+
+    # ==========================================
+    # Save
+    # ==========================================
+    print(f"\n[5] Saving fine-tuned model to: {OUTPUT_DIR}")
+    if USE_LORA:
+        # Merge adapters into the base weights so server.py can load a plain model
+        final_model = trainer.model.merge_and_unload()
+        final_model.save_pretrained(OUTPUT_DIR)
+    else:
+        final_model = trainer.model
+        trainer.save_model(OUTPUT_DIR)
+    processor.save_pretrained(OUTPUT_DIR)
+
+    if QUANTIZE_INT8:
+        int8_path = os.path.join(OUTPUT_DIR, INT8_MODEL_FILE)
+        print(f"\n[6] Quantizing to INT8 (calibrating on {CALIBRATION_SAMPLES} test images)...")
+        try:
+            torch.jit.save(quantize_static_int8(final_model, test_ds, collate), int8_path)
+            print(f"   INT8 model saved to: {int8_path}")
+        except Exception as e:
+            # The FP32 model is already saved - quantization is a bonus
+            print(f"   [WARNING] INT8 quantization failed: {e}")
+
+    print("\n" + "=" * 60)
+    print("[SUCCESS] Fine-tuning complete!")
+    print("=" * 60)
+    print(f"\nModel saved to: {OUTPUT_DIR}/")
+    print("\nTo use this model, update backend/server.py:")
+    print('   MODEL_PATH = "./social_media_tuned_model"')
+    if QUANTIZE_INT8:
+        print(f"For CPU serving, the INT8 TorchScript model is {OUTPUT_DIR}/{INT8_MODEL_FILE}")
+        print("   (load with torch.jit.load; input: pixel_values from the same processor)")
+    print("\nDone!")
+
+
+# DataLoader workers re-import this module under the spawn start method
+# (Windows/macOS), so training must only run in the main process
+if __name__ == "__main__":
+    main()
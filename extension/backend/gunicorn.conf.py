@@ -0,0 +1,19 @@
+"""
+UnReal - Gunicorn settings for the text detection backend
+Picked up automatically when gunicorn is started from this directory.
+
+The --preload master only memory-maps the FP32 weights (text_detector.load_model).
+Each worker builds its own inference backend and batching thread after the
+fork, so no OpenMP pool or ONNX Runtime session is ever inherited from the master.
+"""
+
+import sys
+
+preload_app = True
+
+
+def post_worker_init(worker):
+    """Build the inference backend and start the batcher in a fresh worker."""
+    text_detector = sys.modules.get("text_detector")
+    if text_detector is not None:  # Not loaded when serving audio_detector:app
+        text_detector.get_batcher()
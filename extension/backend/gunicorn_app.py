@@ -0,0 +1,31 @@
+"""
+UnReal - Gunicorn entrypoint for the text detection backend
+Serves text_detector.app with multiple worker processes instead of the
+single-process Flask development server.
+
+With --preload the FP32 weights are memory-mapped once in the master
+process and shared copy-on-write by all workers. The inference backend
+and batching thread are built in each worker after the fork (the
+post_worker_init hook in gunicorn.conf.py). Only UNREAL_TEXT_PRECISION=fp32
+keeps serving from the shared weights: the default INT8 quantization (and
+the bf16/torchscript/onnx backends) give every worker a private copy.
+Without --preload every worker loads its own copy of the model.
+
+Usage:
+    gunicorn -c gunicorn.conf.py -w 2 -k gthread --threads 4 -b 127.0.0.1:8001 gunicorn_app:app
+
+The audio backend has no model to load and can be served directly:
+    gunicorn -w 2 -k gthread --threads 4 -b 127.0.0.1:8002 audio_detector:app
+"""
+
+import os
+
+WORKERS = int(os.environ.get("UNREAL_WORKERS", 2))
+
+# Split the physical cores between workers so the OpenMP/MKL pools of
+# different workers don't oversubscribe the CPU. Must be set before torch is imported.
+os.environ.setdefault("OMP_NUM_THREADS", str(max(1, (os.cpu_count() or 2) // 2 // WORKERS)))
+
+from text_detector import app, load_model  # noqa: E402
+
+load_model()
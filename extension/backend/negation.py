@@ -0,0 +1,63 @@
+"""
+UnReal - Headline negation detection
+Whole-word negation matching used by the news checker in server.py
+"""
+
+import functools
+import re
+
+
+def word_trie_regex(words):
+    """
+    Compile whole-word literals into one regex shaped like a prefix trie
+    (e.g. "no|none|not" -> "no(?:ne|t)?"), so each position is matched by
+    walking shared prefixes once instead of trying every word in turn.
+    Longer words win over their prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}  # End of word
+    
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    
+    return re.compile(r'\b' + build(trie) + r'\b')
+
+
+# Negation words that typically flip the meaning of a headline - WHOLE WORDS only
+# ("not" but not "another"/"nothing", "no" but not "now"/"know")
+NEGATION_CONTRACTIONS = [
+    'does', 'do', 'did', 'wo', 'would', 'could', 'should',
+    'is', 'are', 'was', 'were', 'has', 'have', 'had',
+]
+NEGATION_WORDS = [
+    'not', 'never', 'no', 'none',
+    *[verb + suffix for verb in NEGATION_CONTRACTIONS for suffix in ("n't", "nt")],
+    'denies', 'denied', 'false', 'fake', 'hoax', 'debunked', 'untrue',
+    'incorrect', 'wrong', 'fails', 'failed', 'refuses', 'rejected', 'rejects',
+    # Phrases are reported as one negation ("did not", not "not")
+    'did not', 'does not', 'will not', 'cannot', 'can not',
+]
+NEGATION_RE = word_trie_regex(NEGATION_WORDS)
+# Substrings at least one of which occurs in every negation word: if none is
+# present the regex cannot match and is skipped
+NEGATION_PROBES = (
+    'no', "n't", 'nt', 'never', 'false', 'fake', 'denie', 'reject',
+    'fail', 'debunk', 'hoax', 'wrong', 'untrue', 'incorrect', 'refuse',
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def find_negations(headline_lower: str) -> tuple:
+    """Negation words in a lowercased headline, deduplicated in order of appearance"""
+    if not any(probe in headline_lower for probe in NEGATION_PROBES):
+        return ()
+    return tuple(dict.fromkeys(NEGATION_RE.findall(headline_lower)))
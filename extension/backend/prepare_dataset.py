@@ -10,50 +10,234 @@ Run: python prepare_dataset.py
 """
 
 import os
-from datasets import load_dataset
+import importlib.util
+
+# Multi-connection Hub downloads via the Rust hf_transfer client (read at
+# huggingface_hub import time, so set before importing datasets)
+if importlib.util.find_spec("hf_transfer") is not None:
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
+import fsspec
+from datasets import load_dataset, Image as DatasetImage
+from huggingface_hub import HfApi, hf_hub_download
+import pyarrow.parquet as pq
 from PIL import Image
 import io
 import random
+import shutil
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
 
 # Configuration
 REAL_COUNT = 2000     # 1000 from COCO, 1000 from AI-vs-Real (Real subset)
 AI_COUNT = 2000       # 1000 from Flux, 1000 from Midjourney v6
 OUTPUT_DIR = "./dataset"
+HF_CACHE_DIR = "./hf_cache"  # Downloaded Parquet shards, reused across runs
+
+# Resize + JPEG encoding runs in a process pool (CPU-bound, GIL-free)
+MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+MAX_IN_FLIGHT = 4 * MAX_WORKERS  # Bounds how many encoded images sit in memory
+PREFETCH_SIZE = 32  # Dataset items fetched ahead of processing
+
+# Per-worker scratch state (encode buffer reused across images)
+_LOCAL = threading.local()
+
+# Streaming reads shards through fsspec; the default 5 MiB block means many
+# small HTTPS range requests per shard
+fsspec.spec.AbstractBufferedFile.DEFAULT_BLOCK_SIZE = 64 * 2**20
+
+# Workers encode into PENDING_DIR; finished images are moved into place in completion order
+PENDING_DIR = f"{OUTPUT_DIR}/.pending"
 
 # Create directory structure
 for split in ["train", "test"]:
     for label in ["real", "ai"]:
         os.makedirs(f"{OUTPUT_DIR}/{split}/{label}", exist_ok=True)
+os.makedirs(PENDING_DIR, exist_ok=True)
 
 
-def save_image_as_twitter(image, path):
-    """Saves image with simulated Twitter compression (Quality 65-85)"""
+def save_image_as_twitter(image_bytes, path, scale, quality):
+    """
+    Saves image with simulated Twitter compression (Quality 65-85)
+    Runs in a worker process - random choices are made by the caller so
+    forked workers don't share one RNG state
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    if scale is not None:
+        new_size = (int(image.width * scale), int(image.height * scale))
+        # JPEG only: let libjpeg downscale in the DCT domain (never below
+        # new_size) so LANCZOS works on a smaller buffer. No-op otherwise.
+        image.draft("RGB", new_size)
     if image.mode != "RGB":
         image = image.convert("RGB")
     
     # 1. Random Resize (Twitter often downscales)
-    if random.random() > 0.5:
-        scale = random.uniform(0.75, 1.0)
-        new_size = (int(image.width * scale), int(image.height * scale))
+    if scale is not None:
         image = image.resize(new_size, Image.Resampling.LANCZOS)
 
     # 2. JPEG Compression (Twitter uses quality 75-85)
-    buffer = io.BytesIO()
-    quality = random.randint(65, 85) 
-    image.save(buffer, format="JPEG", quality=quality)
+    # One reusable buffer per worker; optimize=True would double encode time
+    buffer = getattr(_LOCAL, 'buffer', None)
+    if buffer is None:
+        buffer = _LOCAL.buffer = io.BytesIO()
+    buffer.seek(0)
+    buffer.truncate()
+    image.save(buffer, format="JPEG", quality=quality, optimize=False)
     
     with open(path, "wb") as f:
-        f.write(buffer.getbuffer())
+        view = buffer.getbuffer()
+        try:
+            f.write(view)
+        finally:
+            view.release()  # BytesIO can't be resized while a view is exported
+
+
+def encode_source_image(img):
+    """Get encoded bytes for a dataset image (raw bytes, {'bytes': ...} dict or PIL image)"""
+    if isinstance(img, dict):
+        img = img.get('bytes') or Image.open(img['path'])
+    if isinstance(img, (bytes, bytearray)):
+        return bytes(img)
+    # Decoded PIL image: uncompressed PNG is lossless and cheap to encode
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", compress_level=0)
+    return buffer.getvalue()
+
+
+class Prefetcher:
+    """Pulls items from a dataset stream on a background thread into a bounded queue"""
+    _SENTINEL = object()
+    
+    def __init__(self, stream, size=PREFETCH_SIZE):
+        self.queue = queue.Queue(maxsize=size)
+        self.stopped = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(stream,), daemon=True)
+        self.thread.start()
+    
+    def _run(self, stream):
+        try:
+            for item in stream:
+                if not self._put(item):
+                    return
+        except Exception as e:
+            self.error = e
+        self._put(self._SENTINEL)
+    
+    def _put(self, item):
+        # Poll so the thread exits once the consumer stops early
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def __iter__(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is self._SENTINEL:
+                    if self.error:
+                        raise self.error
+                    return
+                yield item
+        finally:
+            self.stopped.set()
+
+
+def find_parquet_shards(repo_id, split):
+    """Return (revision, shard paths) for a dataset split's Parquet files, or (None, [])"""
+    api = HfApi()
+    # Repos uploaded as Parquet have shards on main; others get an auto-converted copy
+    for revision in (None, "refs/convert/parquet"):
+        try:
+            files = api.list_repo_files(repo_id, repo_type="dataset", revision=revision)
+        except Exception:
+            continue
+        shards = []
+        for path in files:
+            parts = path.split("/")
+            name = parts[-1]
+            if name.endswith(".parquet") and (split in parts[:-1] or name.startswith((f"{split}-", f"{split}."))):
+                shards.append(path)
+        if shards:
+            return revision, sorted(shards)
+    return None, []
+
+
+def parquet_rows(repo_id, revision, shards):
+    """Yield row dicts from Parquet shards, downloading each shard only when reached"""
+    for shard in shards:
+        path = hf_hub_download(repo_id, shard, repo_type="dataset", revision=revision, cache_dir=HF_CACHE_DIR)
+        # pre_buffer coalesces column-chunk reads and fetches them on Arrow's IO pool
+        parquet_file = pq.ParquetFile(path, pre_buffer=True)
+        columns = [c for c in ('image', 'jpg', 'img', 'label') if c in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=256, columns=columns):
+            yield from batch.to_pylist()
 
 
-def process_dataset(dataset_stream, label, source_name, max_count):
-    """Process images from a HuggingFace dataset stream"""
+def load_image_rows(repo_id, split="train", **kwargs):
+    """
+    Rows from locally cached Parquet shards (image columns stay as encoded
+    {'bytes', 'path'} dicts). Falls back to HF streaming when the repo has
+    no Parquet files.
+    """
+    revision, shards = find_parquet_shards(repo_id, split)
+    if not shards:
+        return load_dataset(repo_id, split=split, streaming=True, **kwargs)
+    print(f"  Using {len(shards)} Parquet shard(s) from {repo_id}")
+    return parquet_rows(repo_id, revision, shards)
+
+
+def without_image_decoding(dataset):
+    """
+    Cast image columns to undecoded {'bytes', 'path'} dicts, so the encoded
+    bytes go straight to the process pool: images are decoded once, in the
+    workers, instead of in the main process and then re-encoded to PNG
+    """
+    for column, feature in (getattr(dataset, 'features', None) or {}).items():
+        if isinstance(feature, DatasetImage):
+            dataset = dataset.cast_column(column, DatasetImage(decode=False))
+    return dataset
+
+
+def process_dataset(dataset_stream, label, source_name, max_count, executor):
+    """Process images from a HuggingFace dataset stream, return saved counts per split"""
     print(f">>> Processing {source_name} ({label})...")
-    count = 0
+    dataset_stream = without_image_decoding(dataset_stream)
+    counts = {"train": 0, "test": 0}
+    next_id = 0
+    in_flight = {}  # future -> pending path
     
-    for item in tqdm(dataset_stream):
-        if count >= max_count:
+    def collect(done):
+        # Split and filename come from the number of images saved so far (as
+        # in a sequential run), so failed images don't shift the 80/20 split
+        for future in done:
+            pending_path = in_flight.pop(future)
+            try:
+                future.result()
+            except Exception as e:
+                print(f"  Skipped image: {e}")
+                if os.path.exists(pending_path):
+                    os.remove(pending_path)
+                continue
+            saved = sum(counts.values())
+            split = "train" if saved < (max_count * 0.8) else "test"
+            os.replace(pending_path, f"{OUTPUT_DIR}/{split}/{label}/{source_name}_{saved}.jpg")
+            counts[split] += 1
+    
+    # Network fetch (thread) -> dispatch (main) -> resize/encode (process pool)
+    for item in tqdm(Prefetcher(dataset_stream)):
+        # Bound memory: wait while the pool is full, or while pending saves
+        # could already reach max_count (a failure means we need more items)
+        while len(in_flight) >= MAX_IN_FLIGHT or (in_flight and sum(counts.values()) + len(in_flight) >= max_count):
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+        if sum(counts.values()) >= max_count:
             break
         
         try:
@@ -62,16 +246,29 @@ def process_dataset(dataset_stream, label, source_name, max_count):
             if not img:
                 continue
 
-            # 80% Train, 20% Test
-            split = "train" if count < (max_count * 0.8) else "test"
-            filename = f"{source_name}_{count}.jpg"
-            save_image_as_twitter(img, f"{OUTPUT_DIR}/{split}/{label}/{filename}")
-            count += 1
+            # 80% Train, 20% Test - assigned in collect() once the save succeeds
+            pending_path = f"{PENDING_DIR}/{source_name}_{next_id}.jpg"
+            scale = random.uniform(0.75, 1.0) if random.random() > 0.5 else None
+            quality = random.randint(65, 85)
+            image_bytes = encode_source_image(img)
+            # Always re-encode: the q65-85 JPEG pass is the simulated compression,
+            # even when the resize is skipped (scale is None)
+            in_flight[executor.submit(save_image_as_twitter, image_bytes, pending_path, scale, quality)] = pending_path
+            next_id += 1
         except Exception as e:
             print(f"  Skipped image: {e}")
             continue
     
-    print(f"  [OK] Saved {count} images from {source_name}")
+    done, _ = wait(in_flight)
+    collect(done)
+    print(f"  [OK] Saved {sum(counts.values())} images from {source_name}")
+    return counts
+
+
+def add_counts(totals, label, counts):
+    """Accumulate per-split counts returned by process_dataset"""
+    for split, count in counts.items():
+        totals[(split, label)] += count
 
 
 def main():
@@ -79,60 +276,67 @@ def main():
     print("Social Media Dataset Preparation")
     print("=" * 60)
     
-    # ==========================================
-    # 1. REAL IMAGES (COCO + Social Real)
-    # ==========================================
-    print("\n[1/2] Downloading REAL images...\n")
-    
-    # COCO (Standard messy real photos)
-    try:
-        ds_coco = load_dataset("detection-datasets/coco", split="train", streaming=True)
-        process_dataset(ds_coco, "real", "coco", 1000)
-    except Exception as e:
-        print(f"Warning: COCO failed - {e}")
-        # Fallback to another real dataset
-        print("Trying alternative real dataset...")
-        ds_alt = load_dataset("imagenet-1k", split="train", streaming=True, trust_remote_code=True)
-        process_dataset(ds_alt, "real", "imagenet", 1000)
-    
-    # Parveshiiii AI-vs-Real (Real subset)
-    try:
-        ds_social = load_dataset("Parveshiiii/AI-vs-Real", split="train", streaming=True)
-        # Filter only label 1 (Real)
-        ds_social_real = (item for item in ds_social if item.get('label') == 1)
-        process_dataset(ds_social_real, "real", "social_real", 1000)
-    except Exception as e:
-        print(f"Warning: AI-vs-Real failed - {e}")
-    
-    # ==========================================
-    # 2. AI IMAGES (Flux + Midjourney)
-    # ==========================================
-    print("\n[2/2] Downloading AI images...\n")
+    # Images saved this run, per (split, label)
+    totals = {(split, label): 0 for split in ["train", "test"] for label in ["real", "ai"]}
     
-    # Flux.1 (Modern hard-to-detect AI)
-    try:
-        ds_flux = load_dataset("LukasT9/Flux-1-Dev-Images-1k", split="train", streaming=True)
-        process_dataset(ds_flux, "ai", "flux1", 1000)
-    except Exception as e:
-        print(f"Warning: Flux dataset failed - {e}")
-        # Fallback
-        print("Trying alternative AI dataset...")
-        ds_sd = load_dataset("Chris1/stablediffusion-images", split="train", streaming=True)
-        process_dataset(ds_sd, "ai", "stablediffusion", 1000)
-    
-    # Midjourney v6
-    try:
-        ds_mj = load_dataset("CortexLM/midjourney-v6", split="train", streaming=True)
-        process_dataset(ds_mj, "ai", "mjv6", 1000)
-    except Exception as e:
-        print(f"Warning: Midjourney failed - {e}")
-        # Fallback to any available MJ dataset
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # ==========================================
+        # 1. REAL IMAGES (COCO + Social Real)
+        # ==========================================
+        print("\n[1/2] Downloading REAL images...\n")
+        
+        # COCO (Standard messy real photos)
+        try:
+            ds_coco = load_image_rows("detection-datasets/coco")
+            add_counts(totals, "real", process_dataset(ds_coco, "real", "coco", 1000, executor))
+        except Exception as e:
+            print(f"Warning: COCO failed - {e}")
+            # Fallback to another real dataset
+            print("Trying alternative real dataset...")
+            ds_alt = load_image_rows("imagenet-1k", trust_remote_code=True)
+            add_counts(totals, "real", process_dataset(ds_alt, "real", "imagenet", 1000, executor))
+        
+        # Parveshiiii AI-vs-Real (Real subset)
+        try:
+            ds_social = without_image_decoding(load_image_rows("Parveshiiii/AI-vs-Real"))
+            # Filter only label 1 (Real)
+            ds_social_real = (item for item in ds_social if item.get('label') == 1)
+            add_counts(totals, "real", process_dataset(ds_social_real, "real", "social_real", 1000, executor))
+        except Exception as e:
+            print(f"Warning: AI-vs-Real failed - {e}")
+        
+        # ==========================================
+        # 2. AI IMAGES (Flux + Midjourney)
+        # ==========================================
+        print("\n[2/2] Downloading AI images...\n")
+        
+        # Flux.1 (Modern hard-to-detect AI)
         try:
-            ds_mj_alt = load_dataset("tarudesu/midjourney-v6-jpg", split="train", streaming=True)
-            process_dataset(ds_mj_alt, "ai", "mjv6_alt", 1000)
-        except:
-            pass
+            ds_flux = load_image_rows("LukasT9/Flux-1-Dev-Images-1k")
+            add_counts(totals, "ai", process_dataset(ds_flux, "ai", "flux1", 1000, executor))
+        except Exception as e:
+            print(f"Warning: Flux dataset failed - {e}")
+            # Fallback
+            print("Trying alternative AI dataset...")
+            ds_sd = load_image_rows("Chris1/stablediffusion-images")
+            add_counts(totals, "ai", process_dataset(ds_sd, "ai", "stablediffusion", 1000, executor))
+        
+        # Midjourney v6
+        try:
+            ds_mj = load_image_rows("CortexLM/midjourney-v6")
+            add_counts(totals, "ai", process_dataset(ds_mj, "ai", "mjv6", 1000, executor))
+        except Exception as e:
+            print(f"Warning: Midjourney failed - {e}")
+            # Fallback to any available MJ dataset
+            try:
+                ds_mj_alt = load_image_rows("tarudesu/midjourney-v6-jpg")
+                add_counts(totals, "ai", process_dataset(ds_mj_alt, "ai", "mjv6_alt", 1000, executor))
+            except:
+                pass
     
+    # Leftovers from sources that failed mid-stream
+    shutil.rmtree(PENDING_DIR, ignore_errors=True)
+        
     # ==========================================
     # Summary
     # ==========================================
@@ -142,11 +346,9 @@ def main():
     
     # Count files
     total = 0
-    for split in ["train", "test"]:
-        for label in ["real", "ai"]:
-            count = len(os.listdir(f"{OUTPUT_DIR}/{split}/{label}"))
-            print(f"  {split}/{label}: {count} images")
-            total += count
+    for (split, label), count in totals.items():
+        print(f"  {split}/{label}: {count} images")
+        total += count
     
     print(f"\n  Total: {total} images")
     print(f"\nDataset saved to: {OUTPUT_DIR}/")
@@ -0,0 +1,70 @@
+"""
+Pins find_negations() against the original per-pattern negation loop.
+
+Run: python -m pytest test_negation.py
+"""
+
+import re
+
+import pytest
+
+from negation import find_negations
+
+# The 37 whole-word patterns detect_negation_manipulation used to search one by one
+LEGACY_PATTERNS = [
+    r'\bnot\b', r'\bnever\b', r'\bno\b', r'\bnone\b',
+    r"\bdoesn'?t\b", r"\bdon'?t\b", r"\bdidn'?t\b", r"\bwon'?t\b",
+    r"\bwouldn'?t\b", r"\bcouldn'?t\b", r"\bshouldn'?t\b", r"\bisn'?t\b",
+    r"\baren'?t\b", r"\bwasn'?t\b", r"\bweren'?t\b", r"\bhasn'?t\b",
+    r"\bhaven'?t\b", r"\bhadn'?t\b",
+    r'\bdenies\b', r'\bdenied\b', r'\bfalse\b', r'\bfake\b', r'\bhoax\b',
+    r'\bdebunked\b', r'\buntrue\b', r'\bincorrect\b', r'\bwrong\b',
+    r'\bfails\b', r'\bfailed\b', r'\brefuses\b', r'\brejected\b', r'\brejects\b',
+    r'\bdid not\b', r'\bdoes not\b', r'\bwill not\b', r'\bcannot\b', r'\bcan not\b',
+]
+
+HEADLINES = [
+    "President did not sign the climate bill",
+    "Minister denies report, says claims are false",
+    "Another day, nothing new: notice posted now",
+    "Scientists can not explain why the bridge failed",
+    "It doesnt matter and we won't stop, no way",
+    "Company rejects offer; board refuses to comment",
+    "Viral photo is a hoax, fact-checkers say it's fake and untrue",
+    "Officials say the rumor is incorrect and wrong",
+    "He will not run again, and she cannot either",
+    "Nothing here knows nonsense",
+    "Mayor never visited the plant, did not respond",
+]
+
+
+def legacy_negations(headline_lower):
+    found = []
+    for pattern in LEGACY_PATTERNS:
+        match = re.search(pattern, headline_lower)
+        if match and match.group() not in found:
+            found.append(match.group())
+    return found
+
+
+def words(negations):
+    return {word for negation in negations for word in negation.split()}
+
+
+@pytest.mark.parametrize("headline", HEADLINES)
+def test_same_words_as_legacy_loop(headline):
+    # Phrases are now reported once ("did not" instead of "not" + "did not"),
+    # so compare the words that were flagged
+    headline_lower = headline.lower()
+    assert words(find_negations(headline_lower)) == words(legacy_negations(headline_lower))
+
+
+@pytest.mark.parametrize("headline, expected", [
+    ("President did not sign the climate bill", ("did not",)),
+    ("Another day, nothing new: notice posted now", ()),
+    ("Mayor never visited the plant, did not respond", ("never", "did not")),
+    ("It doesnt matter and we won't stop, no way", ("doesnt", "won't", "no")),
+    ("Scientists can not explain why the bridge failed", ("can not", "failed")),
+])
+def test_find_negations(headline, expected):
+    assert find_negations(headline.lower()) == expected
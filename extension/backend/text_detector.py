@@ -14,20 +14,51 @@ Endpoint:
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+from safetensors.torch import load_file
+import numpy as np
 import torch
+from collections import OrderedDict
+import hashlib
 import logging
 import os
+import queue
+import re
+import threading
+import time
 
 # Configuration
 MODEL_NAME = "roberta-base-openai-detector"
 PORT = 8001  # Different port from image backend (8000)
 HOST = "127.0.0.1"
 MIN_WORDS = 15
+FIRST_PERSON_WORDS = frozenset(["i", "me", "my", "we", "our", "us"])
+
+# CPU inference tuning
+# Intra-op threads for PyTorch (gunicorn_app.py sets OMP_NUM_THREADS per worker)
+NUM_THREADS = int(os.environ.get("OMP_NUM_THREADS", 0)) or max(1, (os.cpu_count() or 2) // 2)
+# Model precision: "int8" (dynamic quantization), "bf16" (IPEX + autocast) or "fp32"
+MODEL_PRECISION = os.environ.get("UNREAL_TEXT_PRECISION", "int8").lower()
+# Inference backend: "torch" (eager PyTorch), "torchscript" (frozen FP32 graph)
+# or "onnx" (ONNX Runtime, INT8). MODEL_PRECISION only applies to "torch".
+TEXT_BACKEND = os.environ.get("UNREAL_TEXT_BACKEND", "torch").lower()
+MAX_LENGTH = 512
+
+# Micro-batching of concurrent /detect requests
+BATCH_WINDOW_MS = 8   # How long the worker waits to fill a batch
+MAX_BATCH_SIZE = 16
+
+# LRU cache of (ai_prob, human_prob) keyed by text digest
+RESULT_CACHE_SIZE = 4096
 
 # Use local model path (relative to this script)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(SCRIPT_DIR, "text_model")
+# UNREAL_TEXT_MODEL_PATH can point at a distilled checkpoint (distill_text_model.py)
+MODEL_PATH = os.environ.get("UNREAL_TEXT_MODEL_PATH", os.path.join(SCRIPT_DIR, "text_model"))
+ONNX_DIR = os.path.join(SCRIPT_DIR, "text_model_onnx")
+# Checkpoint keys the classifier doesn't use: the base model's pooler (the
+# classification head has its own dense layer) and stale position_ids buffers
+BENIGN_UNEXPECTED_KEYS = [r"(^|\.)pooler\.", r"(^|\.)position_ids$"]
 
 # Logging setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -40,15 +71,28 @@ CORS(app)  # Enable Cross-Origin Resource Sharing for browser extension access
 # Global variables for model/tokenizer
 tokenizer = None
 model = None
+onnx_session = None  # Set instead of model when TEXT_BACKEND == "onnx"
+batcher = None       # InferenceBatcher, started lazily in each (post-fork) process
+batcher_lock = threading.Lock()
+model_ready = False  # Set by prepare_model() in each (post-fork) process
+model_lock = threading.Lock()
+result_cache = OrderedDict()
+result_cache_lock = threading.Lock()
 
 def load_model():
-    """Load model and tokenizer once at startup."""
+    """
+    Load the tokenizer and the FP32 weights once at startup.
+    
+    Only memory-mapped weights are loaded here, so this is safe to run in a
+    Gunicorn --preload master: no OpenMP pools, ONNX Runtime sessions or
+    threads exist before the fork. The inference backend is built per
+    process by prepare_model().
+    """
     global tokenizer, model
     try:
         logger.info(f"Loading model from local path: {MODEL_PATH}...")
         tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH, local_files_only=True)
-        model = AutoModelForSequenceClassification.from_pretrained(MODEL_PATH, local_files_only=True)
-        model.eval()  # Set to evaluation mode
+        model = load_local_weights(MODEL_PATH)
         logger.info("Local model loaded successfully.")
     except Exception as e:
         logger.error(f"Failed to load local model: {e}")
@@ -56,12 +100,298 @@ def load_model():
         try:
             tokenizer = AutoTokenizer.from_pretrained("openai-community/roberta-base-openai-detector")
             model = AutoModelForSequenceClassification.from_pretrained("openai-community/roberta-base-openai-detector")
-            model.eval()
             logger.info("Model loaded from HuggingFace successfully.")
         except Exception as e2:
             logger.error(f"Failed to load model from HuggingFace: {e2}")
             raise e2
 
+    model.eval()  # Set to evaluation mode
+
+def prepare_model():
+    """
+    Build this process's inference backend from the FP32 model.
+    
+    Runs once per process (after the fork under Gunicorn, see gunicorn.conf.py).
+    Only the "fp32" torch backend keeps using the shared memory-mapped
+    weights; INT8 quantization, IPEX, TorchScript and ONNX Runtime all
+    allocate a private copy of the weights in each worker.
+    """
+    global model, onnx_session, model_ready
+    if model_ready:
+        return
+    with model_lock:
+        if model_ready:
+            return
+        torch.set_num_threads(NUM_THREADS)
+        if TEXT_BACKEND == "onnx":
+            onnx_session = load_onnx_session(model)
+            model = None  # Torch weights are no longer needed
+        elif TEXT_BACKEND == "torchscript":
+            model = script_model(model)
+        elif MODEL_PRECISION == "int8":
+            model = quantize_model(model)
+        elif MODEL_PRECISION == "bf16":
+            model = optimize_model_bf16(model)
+        model_ready = True
+
+def load_local_weights(path):
+    """
+    Build the model from its config and load memory-mapped safetensors weights.
+    
+    The tensors stay backed by the OS page cache, so Gunicorn workers forked
+    from a --preload master share one read-only copy instead of each holding
+    its own. Checkpoints without model.safetensors use the regular loader
+    (convert once with save_pretrained(path, safe_serialization=True)).
+    Raises ValueError if the file lacks any model weight or carries weights
+    the model doesn't have, instead of serving randomly initialized layers.
+    """
+    weights_path = os.path.join(path, "model.safetensors")
+    if not os.path.exists(weights_path):
+        return AutoModelForSequenceClassification.from_pretrained(path, local_files_only=True)
+
+    config = AutoConfig.from_pretrained(path, local_files_only=True)
+    local_model = AutoModelForSequenceClassification.from_config(config)
+    state = load_file(weights_path, device="cpu")
+    missing, unexpected = local_model.load_state_dict(state, strict=False, assign=True)
+    # Only keys the model class declares ignorable (e.g. stale position_ids buffers)
+    missing = unignored_keys(missing, local_model._keys_to_ignore_on_load_missing)
+    unexpected = unignored_keys(
+        unexpected, BENIGN_UNEXPECTED_KEYS + (local_model._keys_to_ignore_on_load_unexpected or [])
+    )
+    if missing:
+        # Would otherwise be served with from_config's random initialization
+        raise ValueError(f"{weights_path} is missing weights: {missing}")
+    if unexpected:
+        raise ValueError(f"{weights_path} has unexpected weights: {unexpected}")
+    return local_model
+
+def unignored_keys(keys, ignore_patterns):
+    """State dict keys not matched by any of a model class's ignore regexes"""
+    patterns = [re.compile(pattern) for pattern in ignore_patterns or []]
+    return [key for key in keys if not any(pattern.search(key) for pattern in patterns)]
+
+def quantize_model(fp32_model):
+    """
+    Apply dynamic INT8 quantization to the Linear layers.
+    Uses the x86 (oneDNN) backend when available for VNNI-accelerated matmuls.
+    """
+    if "x86" in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = "x86"
+    quantized = torch.quantization.quantize_dynamic(fp32_model, {torch.nn.Linear}, dtype=torch.qint8)
+    logger.info(f"Model quantized to INT8 (engine: {torch.backends.quantized.engine}, threads: {NUM_THREADS})")
+    return quantized
+
+def optimize_model_bf16(fp32_model):
+    """
+    Fuse LayerNorm/GeLU/matmul with Intel Extension for PyTorch and target
+    AVX-512 BF16 / AMX. Inference then runs under BF16 autocast.
+    Falls back to plain autocast if IPEX is not installed.
+    """
+    try:
+        import intel_extension_for_pytorch as ipex
+        optimized = ipex.optimize(fp32_model, dtype=torch.bfloat16, inplace=True)
+        logger.info("Model optimized with IPEX (BF16)")
+        return optimized
+    except ImportError:
+        logger.warning("intel_extension_for_pytorch not installed - using BF16 autocast only")
+        return fp32_model
+
+def load_onnx_session(fp32_model):
+    """
+    Load the INT8 ONNX Runtime session, exporting and quantizing the
+    model on first use (cached in ONNX_DIR for subsequent startups).
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    fp32_path = os.path.join(ONNX_DIR, "model.onnx")
+    int8_path = os.path.join(ONNX_DIR, "model.int8.onnx")
+
+    if not os.path.exists(int8_path):
+        # Workers may export concurrently: write per-process files, then rename
+        tmp_fp32_path = os.path.join(ONNX_DIR, f"model.{os.getpid()}.tmp.onnx")
+        tmp_int8_path = os.path.join(ONNX_DIR, f"model.int8.{os.getpid()}.tmp.onnx")
+        logger.info(f"Exporting model to ONNX: {fp32_path}")
+        os.makedirs(ONNX_DIR, exist_ok=True)
+        dummy = tokenizer("dummy input", return_tensors="pt")
+        torch.onnx.export(
+            fp32_model,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            tmp_fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=17,
+        )
+        quantize_dynamic(tmp_fp32_path, tmp_int8_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_fp32_path, fp32_path)
+        os.replace(tmp_int8_path, int8_path)
+        logger.info(f"Quantized ONNX model saved: {int8_path}")
+
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.intra_op_num_threads = NUM_THREADS
+    session = ort.InferenceSession(int8_path, sess_options, providers=["CPUExecutionProvider"])
+    logger.info("ONNX Runtime session ready (INT8)")
+    return session
+
+def script_model(fp32_model):
+    """
+    Trace, freeze and optimize the model with TorchScript.
+    The graph is traced at MAX_LENGTH, so inputs are padded to that length.
+    """
+    dummy = tokenizer("dummy input", return_tensors="pt", padding="max_length", max_length=MAX_LENGTH)
+    example = (dummy["input_ids"], dummy["attention_mask"])
+    with torch.inference_mode():
+        scripted = torch.jit.trace(fp32_model, example, strict=False)
+        scripted = torch.jit.freeze(scripted)
+        scripted = torch.jit.optimize_for_inference(scripted)
+        # Warm up twice: the profiling executor specializes on the second call
+        for _ in range(2):
+            scripted(*example)
+    logger.info(f"Model scripted with TorchScript (sequence length {MAX_LENGTH})")
+    return scripted
+
+def predict_batch(texts):
+    """
+    Run the detector on a list of texts in a single forward pass.
+    
+    For two classes, softmax reduces to a sigmoid of the logit difference:
+    P(label 0) = 1 / (1 + exp(l1 - l0)), so only one value per text is computed
+    and converted back to Python.
+    
+    Returns:
+        List of (ai_prob, human_prob) tuples, one per input text
+    """
+    if onnx_session is not None:
+        inputs = tokenizer(texts, return_tensors="np", padding=True, truncation=True, max_length=MAX_LENGTH)
+        logits = onnx_session.run(None, {
+            "input_ids": inputs["input_ids"].astype(np.int64),
+            "attention_mask": inputs["attention_mask"].astype(np.int64),
+        })[0]
+        ai_probs = (1.0 / (1.0 + np.exp(logits[:, 1] - logits[:, 0]))).tolist()
+    elif TEXT_BACKEND == "torchscript":
+        inputs = tokenizer(texts, return_tensors="pt", truncation=True, padding="max_length", max_length=MAX_LENGTH)
+        with torch.inference_mode():
+            logits = model(inputs["input_ids"], inputs["attention_mask"])["logits"]
+            ai_probs = torch.sigmoid(logits[:, 0] - logits[:, 1]).tolist()
+    else:
+        inputs = tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=MAX_LENGTH
+        )
+        with torch.inference_mode(), torch.autocast("cpu", dtype=torch.bfloat16, enabled=MODEL_PRECISION == "bf16"):
+            logits = model(**inputs).logits
+        # Sigmoid in FP32 regardless of inference precision
+        logits = logits.float()
+        ai_probs = torch.sigmoid(logits[:, 0] - logits[:, 1]).tolist()
+
+    # roberta-base-openai-detector labels: 0 -> Fake (AI), 1 -> Real (Human)
+    # Hugging Face model card for openai-community/roberta-base-openai-detector:
+    # "LABEL_0": "Fake", "LABEL_1": "Real"
+    return [(p, 1.0 - p) for p in ai_probs]
+
+class PendingRequest:
+    """A single text waiting for the batch worker."""
+
+    def __init__(self, text):
+        self.text = text
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class InferenceBatcher:
+    """
+    Micro-batching worker for /detect.
+    Collects requests arriving within BATCH_WINDOW_MS (up to MAX_BATCH_SIZE)
+    and runs them through the model in one forward pass.
+    """
+
+    def __init__(self, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH_SIZE):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, text):
+        """Queue a text and block until its (ai_prob, human_prob) is ready."""
+        pending = PendingRequest(text)
+        self.queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                results = predict_batch([p.text for p in batch])
+                for pending, result in zip(batch, results):
+                    pending.result = result
+            except Exception as e:
+                logger.error(f"Batch inference failed: {e}")
+                for pending in batch:
+                    pending.error = e
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+def get_batcher():
+    """
+    Return this process's InferenceBatcher, starting it on first use.
+    Started lazily so a Gunicorn --preload master never owns the thread.
+    """
+    global batcher
+    if batcher is None:
+        with batcher_lock:
+            if batcher is None:
+                prepare_model()
+                batcher = InferenceBatcher()
+    return batcher
+
+def predict(text):
+    """
+    Run the detector on a single text via the batch worker.
+    Results are cached by a BLAKE2b digest of the text, so re-scans of the
+    same content skip tokenization and inference entirely.
+    
+    Returns:
+        (ai_prob, human_prob) tuple
+    """
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with result_cache_lock:
+        cached = result_cache.get(key)
+        if cached is not None:
+            result_cache.move_to_end(key)
+            return cached
+
+    result = get_batcher().submit(text)
+
+    with result_cache_lock:
+        result_cache[key] = result
+        if len(result_cache) > RESULT_CACHE_SIZE:
+            result_cache.popitem(last=False)
+    return result
+
 @app.route('/detect', methods=['POST'])
 def detect():
     """
@@ -79,7 +409,8 @@ def detect():
         text = data['text']
         
         # 2. Check Text Length
-        word_count = len(text.split())
+        words = text.split()
+        word_count = len(words)
         if word_count < MIN_WORDS:
             return jsonify({
                 "ai_score": 0,
@@ -90,28 +421,8 @@ def detect():
                 "note": "Insufficient text for reliable ML inference"
             })
 
-        # 3. Tokenize
-        inputs = tokenizer(
-            text,
-            return_tensors="pt",
-            truncation=True,
-            max_length=512
-        )
-
-        # 4. Inference
-        with torch.no_grad():
-            outputs = model(**inputs)
-            logits = outputs.logits
-            probs = torch.softmax(logits, dim=1).tolist()[0]
-            
-            # roberta-base-openai-detector labels: 0 -> Fake (AI), 1 -> Real (Human)
-            # WAIT: Let's double check the model labels.
-            # Usually: Label 0 is "Fake" (AI), Label 1 is "Real" (Human).
-            # Hugging Face model card for openai-community/roberta-base-openai-detector:
-            # "LABEL_0": "Fake", "LABEL_1": "Real"
-            
-            ai_prob = probs[0]   # Label 0
-            human_prob = probs[1] # Label 1
+        # 3-4. Tokenize + Inference
+        ai_prob, human_prob = predict(text)
 
         # 5. Format Scores (0-100)
         ai_score = round(ai_prob * 100, 2)
@@ -121,12 +432,14 @@ def detect():
         # 6. Formal Style Heuristic
         # - Avg word length
         # - Absence of first person
-        words = text.split()
-        avg_word_len = sum(len(w) for w in words) / len(words) if words else 0
-        
-        # Check for first-person indicators (I, me, my, we, our, us)
-        text_lower = text.lower()
-        has_first_person = any(token in text_lower.split() for token in ["i", "me", "my", "we", "our", "us"])
+        # - Checked in a single pass over the words from step 2
+        total_len = 0
+        has_first_person = False
+        for w in words:
+            total_len += len(w)
+            if not has_first_person and w.lower() in FIRST_PERSON_WORDS:
+                has_first_person = True
+        avg_word_len = total_len / word_count
         
         # Formal if: Long words AND No first person
         is_formal_style = (avg_word_len > 5.2) and (not has_first_person)
@@ -176,5 +489,7 @@ def detect():
 # Main Runner
 if __name__ == "__main__":
     load_model()
+    prepare_model()
     logger.info(f"Starting server at http://{HOST}:{PORT}")
-    app.run(host=HOST, port=PORT, debug=True)
+    # debug/reloader off: the reloader would load the model twice
+    app.run(host=HOST, port=PORT, debug=False, threaded=True)